@@ -1,3 +1,6 @@
+import hashlib
+import io
+import re
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -26,6 +29,68 @@ los Hidrocarburos, según resolución, escala física, estrategia de monitoreo y
 st.caption("Explora por Segmento × Emisión × Eje × Taxonomía, con Radar de evaluación. Catalogo Base de IA con 120 Tecnologías")
 
 # =============== Carga de datos ===============
+# Harmonización de nombres (alias) desde Excel v3/v4
+COL_ALIASES = {
+    "limite_deteccion": "limite_deteccion_valor",
+    "lod": "limite_deteccion_valor",
+    "plataforma_escala": "escala",   # v3/v4 usa plataforma_escala
+    "plataforma": "escala"           # por si viene como 'plataforma'
+}
+# Puntajes opcionales del Radar: si vienen en el Excel se respetan
+SCORE_COLS = ["exactitud_score","cobertura_score","costo_score","robustez_score"]
+# Columnas leídas por hoja; el resto se descarta en la lectura
+SHEET_COLS = {
+    "Catalogo": [*REQUIRED_CATALOG_COLS, *SCORE_COLS],
+    "Adopcion": REQUIRED_ADOP_COLS,
+    "Contactos": REQUIRED_CONT_COLS,
+}
+# Columnas que se convierten a número más adelante (pueden traer texto) o fechas
+NON_TEXT_COLS = {"trl","trlc","limite_deteccion_valor","fecha", *SCORE_COLS}
+
+def _norm_col(c) -> str:
+    c = str(c).strip().replace("  "," ").replace(" ","_").lower()
+    return COL_ALIASES.get(c, c)
+
+# Normalización de columnas (sin cambios en la lógica original)
+def normalize_cols(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [_norm_col(c) for c in df.columns]
+    return df
+
+def _read_sheet(xl: pd.ExcelFile, name: str) -> pd.DataFrame:
+    # Sólo la fila de encabezados, para mapear dtypes sobre los nombres originales
+    header = xl.parse(name, nrows=0).columns
+    wanted = set(SHEET_COLS[name])
+    dtype = {c: "string" for c in header if _norm_col(c) in wanted - NON_TEXT_COLS}
+    return xl.parse(name, usecols=lambda c: _norm_col(c) in wanted, dtype=dtype)
+
+# Huella de contenido (un único hash vectorizado por DataFrame), guardada en df.attrs.
+# Digest de los hashes por fila en orden (incluye el índice) más columnas y dtypes:
+# cambia si se reordenan filas o cambia la estructura, no sólo si cambian los valores
+def stamp_fingerprint(df: pd.DataFrame) -> pd.DataFrame:
+    h = hashlib.blake2b(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes(), digest_size=16)
+    h.update(repr((tuple(df.columns), df.dtypes.tolist())).encode())
+    df.attrs["fingerprint"] = h.hexdigest()
+    return df
+
+# Las cachés que reciben DataFrames ya sellados los identifican por su huella
+# en lugar de volver a hashear todo el contenido
+FINGERPRINT_HASH = {pd.DataFrame: lambda d: d.attrs["fingerprint"]}
+
+# Lectura cacheada por contenido del archivo: sólo se parsea una vez por Excel
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_workbook(file_bytes: bytes) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    # Un único ExcelFile para todas las hojas (pandas ya abre openpyxl en modo read_only/data_only)
+    sheets = []
+    with pd.ExcelFile(io.BytesIO(file_bytes), engine="openpyxl") as xl:
+        for name in SHEET_COLS:
+            df = _read_sheet(xl, name) if name in xl.sheet_names else pd.DataFrame()
+            sheets.append(normalize_cols(df) if not df.empty else df)
+    # Huella de cada hoja: clave de prepare_catalog (Catálogo) y de to_csv_bytes (Adopción, Contactos)
+    for df in sheets:
+        stamp_fingerprint(df)
+    df_cat, df_adop, df_contacts = sheets
+    return df_cat, df_adop, df_contacts
+
 with st.sidebar:
     st.header("Datos de Entrada")
     st.markdown("Carga de Base de Datos de Monitoreo Tecnológico en formato Excel (.xlsx) con las hojas `Catalogo`, `Adopcion` y `Contactos`.")
@@ -33,50 +98,29 @@ with st.sidebar:
     # DataFrames vacíos por defecto
     df_cat = pd.DataFrame(); df_adop = pd.DataFrame(); df_contacts = pd.DataFrame()
 
-    # Normalización de columnas (sin cambios en la lógica original)
-    def normalize_cols(df: pd.DataFrame) -> pd.DataFrame:
-        df.columns = [str(c).strip().replace("  "," ").replace(" ","_").lower() for c in df.columns]
-        # Harmonización de nombres (alias) desde Excel v3/v4
-        alias_map = {
-            "limite_deteccion": "limite_deteccion_valor",
-            "lod": "limite_deteccion_valor",
-            "plataforma_escala": "escala",   # v3/v4 usa plataforma_escala
-            "plataforma": "escala"           # por si viene como 'plataforma'
-        }
-        return df.rename(columns=alias_map)
-
     # Único cargador de Excel
     up_xlsx = st.file_uploader("Cargar Monitoreo Tecnológico (.xlsx)", type=["xlsx"])
     if up_xlsx is not None:
         try:
-            xl = pd.ExcelFile(up_xlsx)
-            if "Catalogo" in xl.sheet_names:
-                df_cat = pd.read_excel(up_xlsx, sheet_name="Catalogo")
-            if "Adopcion" in xl.sheet_names:
-                df_adop = pd.read_excel(up_xlsx, sheet_name="Adopcion")
-            if "Contactos" in xl.sheet_names:
-                df_contacts = pd.read_excel(up_xlsx, sheet_name="Contactos")
+            df_cat, df_adop, df_contacts = load_workbook(up_xlsx.getvalue())
         except Exception as e:
             st.error(f"Error leyendo Excel: {e}")
 
-    # Normalización posterior a lectura
-    if not df_cat.empty: df_cat = normalize_cols(df_cat)
-    if not df_adop.empty: df_adop = normalize_cols(df_adop)
-    if not df_contacts.empty: df_contacts = normalize_cols(df_contacts)
-
-    # Compatibilidad: si no hay 'escala' pero sí 'plataforma_escala', crear alias
-    if not df_cat.empty and "escala" not in df_cat.columns and "plataforma_escala" in df_cat.columns:
-        df_cat["escala"] = df_cat["plataforma_escala"]
-
     st.divider()
     st.subheader("Diccionario mínimo — Catálogo")
     st.code(", ".join(REQUIRED_CATALOG_COLS), language="text")
 
 # =============== Validaciones ===============
+# El resultado sólo depende de los nombres de columna: se cachea por tupla de columnas
+@st.cache_data(show_spinner=False, max_entries=16)
+def missing_cols(columns: tuple, cols: tuple) -> list:
+    miss = set(cols).difference(columns)
+    return [c for c in cols if c in miss]  # conserva el orden del diccionario en el mensaje
+
 def req_check(df, cols, title):
     if df.empty:
         return False, f"⚠️ No se cargó **{title}**."
-    miss = [c for c in cols if c not in df.columns]
+    miss = missing_cols(tuple(df.columns), tuple(cols))
     if miss:
         return False, f"⚠️ Faltan columnas en **{title}**: {', '.join(miss)}"
     else:
@@ -97,69 +141,116 @@ def as_num(x):
     try: return float(str(x).replace(",", ".").replace(" ", ""))
     except: return np.nan
 
-df_cat["trl_num"] = pd.to_numeric(df_cat.get("trl", np.nan), errors="coerce")
-df_cat["lod_num"] = pd.to_numeric(df_cat.get("limite_deteccion_valor", np.nan), errors="coerce")
-
 # Heurísticas rápidas para puntajes del Radar si no vienen en el Excel
-if "exactitud_score" not in df_cat.columns:
-    def map_exactitud(s):
-        s = str(s).lower()
-        if any(k in s for k in ["ppb","±0.0","muy alta","laboratorio"]): return 90
-        if any(k in s for k in ["±","alta"]): return 75
-        if any(k in s for k in ["media","screening"]): return 60
-        return np.nan
-    df_cat["exactitud_score"] = df_cat.get("exactitud_incertidumbre","").map(map_exactitud)
-
-if "cobertura_score" not in df_cat.columns:
-    def map_cobertura(s):
-        s = str(s).lower()
-        if any(k in s for k in ["regional","satélite","constelación"]): return 90
-        if any(k in s for k in ["área","aéreo","uav","bloque"]): return 75
-        if any(k in s for k in ["on-site","punto","planta"]): return 60
-        return np.nan
-    df_cat["cobertura_score"] = df_cat.get("cobertura_espacial_temporal","").map(map_cobertura)
-
-if "costo_score" not in df_cat.columns:
-    def map_costo(s):
-        s = str(s).lower()
-        if any(k in s for k in ["bajo","low","económico"]): return 90
-        if any(k in s for k in ["medio","moderado"]): return 70
-        if any(k in s for k in ["alto","suscripción","por vuelo","capex"]): return 50
-        return np.nan
-    df_cat["costo_score"] = df_cat.get("costo_capex_opex","").map(map_costo)
-
-if "robustez_score" not in df_cat.columns:
-    def map_robustez(row):
-        clima = str(row.get("condiciones_climaticas","")).lower()
-        op = str(row.get("condiciones_operativas","")).lower()
-        score = 60
-        if any(k in clima for k in ["amplio","rango","outdoor","hostil"]): score += 15
-        if any(k in op for k in ["línea de vista","permiso","espacio aéreo","clasificada"]): score -= 10
-        return max(30, min(95, score))
-    df_cat["robustez_score"] = df_cat.apply(map_robustez, axis=1)
+# (palabras clave → puntaje; gana la primera regla que coincide)
+EXACTITUD_RULES = [(["ppb","±0.0","muy alta","laboratorio"], 90), (["±","alta"], 75), (["media","screening"], 60)]
+COBERTURA_RULES = [(["regional","satélite","constelación"], 90), (["área","aéreo","uav","bloque"], 75), (["on-site","punto","planta"], 60)]
+COSTO_RULES = [(["bajo","low","económico"], 90), (["medio","moderado"], 70), (["alto","suscripción","por vuelo","capex"], 50)]
+
+def keyword_score(s: pd.Series, rules) -> np.ndarray:
+    s = s.astype(str).str.lower()
+    conds = [s.str.contains("|".join(map(re.escape, kws)), regex=True, na=False).to_numpy(dtype=bool)
+             for kws, _ in rules]
+    return np.select(conds, [score for _, score in rules], default=np.nan)
+
+# Robustez: base 60, +15 si tolera clima amplio/hostil, -10 si tiene restricciones operativas; acotado a [30, 95]
+ROBUSTEZ_CLIMA_KW = ["amplio","rango","outdoor","hostil"]
+ROBUSTEZ_OPER_KW = ["línea de vista","permiso","espacio aéreo","clasificada"]
+
+def robustez_score(df: pd.DataFrame) -> np.ndarray:
+    clima = df["condiciones_climaticas"].astype(str).str.lower()
+    op = df["condiciones_operativas"].astype(str).str.lower()
+    bump = clima.str.contains("|".join(map(re.escape, ROBUSTEZ_CLIMA_KW)), regex=True, na=False).to_numpy(dtype="int8") * 15
+    pen = op.str.contains("|".join(map(re.escape, ROBUSTEZ_OPER_KW)), regex=True, na=False).to_numpy(dtype="int8") * 10
+    return np.clip(60 + bump - pen, 30, 95)
+
+# Métricas del Radar y sus etiquetas
+RADAR_METRICS = ["exactitud_score","cobertura_score","costo_score","robustez_score","trl_num"]
+RADAR_LABELS = {"exactitud_score":"Exactitud","cobertura_score":"Cobertura","costo_score":"Costo (invertido)","robustez_score":"Robustez","trl_num":"TRL"}
+
+# Columnas con filtro de selección múltiple
+FILTER_COLS = ["segmento_negocio","tipo_emision","eje_monitoreo","taxonomia"]
+CATEGORICAL_COLS = [*FILTER_COLS, "familia","continuo","proveedor"]
+
+# Columnas auxiliares que no se muestran ni se exportan
+INTERNAL_COLS = ["__search__","continuo_bool"]
+
+# Preprocesamiento cacheado: sólo se recalcula si cambia el catálogo cargado (por su huella,
+# sin volver a hashear el catálogo crudo en cada rerun)
+@st.cache_data(show_spinner=False, max_entries=4, hash_funcs=FINGERPRINT_HASH)
+def prepare_catalog(df: pd.DataFrame) -> tuple[pd.DataFrame, dict[str, tuple]]:
+    df = df.copy()
+    df["trl_num"] = pd.to_numeric(df.get("trl", np.nan), errors="coerce")
+    df["lod_num"] = pd.to_numeric(df.get("limite_deteccion_valor", np.nan), errors="coerce")
+
+    if "exactitud_score" not in df.columns:
+        df["exactitud_score"] = keyword_score(df["exactitud_incertidumbre"], EXACTITUD_RULES)
+    if "cobertura_score" not in df.columns:
+        df["cobertura_score"] = keyword_score(df["cobertura_espacial_temporal"], COBERTURA_RULES)
+    if "costo_score" not in df.columns:
+        df["costo_score"] = keyword_score(df["costo_capex_opex"], COSTO_RULES)
+    if "robustez_score" not in df.columns:
+        df["robustez_score"] = robustez_score(df)
+
+    # TRL (0–9), LOD y puntajes (0–100) reducidos: la mitad de memoria para filtros, medias y gráficos.
+    # Columnas float quedan en float32 (de NumPy, no Float32 nullable: NaN en vez de pd.NA al pasar a Plotly);
+    # las enteras no se tocan, así que robustez_score heurístico sigue en int8
+    for col in ["trl_num","lod_num", *SCORE_COLS]:
+        df[col] = pd.to_numeric(df[col], errors="coerce", downcast="float")
+
+    # Texto de búsqueda libre precalculado (minúsculas) para filtrar con str.contains
+    txt = df[[c for c in REQUIRED_CATALOG_COLS if c in df.columns]].astype("string").fillna("")
+    df["__search__"] = txt.iloc[:, 0].str.cat(txt.iloc[:, 1:], sep=" ").str.lower()
+
+    # Identificador de tecnología para el Radar (proveedor — modelo); category con categorías ordenadas
+    df["key"] = (df["proveedor"].astype("string")
+                 .str.cat(df["producto_modelo"].astype("string"), sep=" — ", na_rep="")
+                 .astype("category"))
+
+    # 'continuo' normalizado a booleano para el KPI % Continuo
+    df["continuo_bool"] = df["continuo"].astype(str).str.lower().isin({"sí","si","true","1"})
+
+    # Columnas de baja cardinalidad como category: isin/groupby/unique sobre códigos enteros
+    for col in CATEGORICAL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    # Huella del catálogo ya preprocesado (tras crear todas las columnas): clave de apply_filters
+    stamp_fingerprint(df)
+
+    # Opciones de los filtros (sólo dependen del catálogo)
+    options = {col: tuple(df[col].cat.categories) for col in FILTER_COLS}
+    return df, options
+
+df_cat, filter_options = prepare_catalog(df_cat)
 
 # =============== Filtros ===============
 st.subheader("🎛️ Filtros")
 c = st.columns(6)
-seg_sel = c[0].multiselect("Segmento de negocio / área", sorted(df_cat["segmento_negocio"].dropna().unique()))
-tipo_sel = c[1].multiselect("Tipo de emisión", sorted(df_cat["tipo_emision"].dropna().unique()))
-eje_sel  = c[2].multiselect("Eje de monitoreo", sorted(df_cat["eje_monitoreo"].dropna().unique()))
-tax_sel  = c[3].multiselect("Taxonomía", sorted(df_cat["taxonomia"].dropna().unique()))
+seg_sel = c[0].multiselect("Segmento de negocio / área", filter_options["segmento_negocio"])
+tipo_sel = c[1].multiselect("Tipo de emisión", filter_options["tipo_emision"])
+eje_sel  = c[2].multiselect("Eje de monitoreo", filter_options["eje_monitoreo"])
+tax_sel  = c[3].multiselect("Taxonomía", filter_options["taxonomia"])
 trl_min  = c[4].number_input("TRL mín", 0, 9, 0)
 trl_max  = c[5].number_input("TRL máx", 0, 9, 9)
 query    = st.text_input("Búsqueda libre", placeholder="Proveedor, modelo, principio…")
 
-def apply_filters(df):
+# Vista filtrada cacheada por (huella del catálogo, filtros). La huella depende del orden,
+# el índice y las columnas de cada carga: nunca se devuelve la vista de otro Excel
+@st.cache_data(show_spinner=False, max_entries=32, hash_funcs=FINGERPRINT_HASH)
+def apply_filters(df, seg_sel, tipo_sel, eje_sel, tax_sel, trl_min, trl_max, query):
     m = pd.Series(True, index=df.index)
     if seg_sel: m &= df["segmento_negocio"].isin(seg_sel)
     if tipo_sel: m &= df["tipo_emision"].isin(tipo_sel)
     if eje_sel:  m &= df["eje_monitoreo"].isin(eje_sel)
     if tax_sel:  m &= df["taxonomia"].isin(tax_sel)
     if "trl_num" in df.columns: m &= df["trl_num"].fillna(0).between(trl_min, trl_max)
-    if query: m &= df.apply(lambda r: query.lower() in " ".join(map(str, r.values)).lower(), axis=1)
-    return df[m]
+    if query: m &= df["__search__"].str.contains(query.lower(), regex=False, na=False)
+    # Huella propia de la vista: se calcula una vez por resultado (queda cacheada con él)
+    # y la reutilizan figuras, tablas y exportación
+    return stamp_fingerprint(df[m])
 
-df_cat_f = apply_filters(df_cat)
+df_cat_f = apply_filters(df_cat, tuple(seg_sel), tuple(tipo_sel), tuple(eje_sel), tuple(tax_sel), trl_min, trl_max, query)
 
 # =============== KPIs ===============
 st.markdown("### 📌 KPIs")
@@ -167,7 +258,7 @@ k1,k2,k3,k4 = st.columns(4)
 k1.metric("Tecnologías", len(df_cat_f))
 k2.metric("Proveedores", df_cat_f["proveedor"].nunique() if not df_cat_f.empty else 0)
 k3.metric("Promedio TRL", f"{df_cat_f['trl_num'].mean():.1f}" if "trl_num" in df_cat_f.columns and not df_cat_f.empty else "—")
-k4.metric("% Continuo", f"{(df_cat_f.get('continuo','').astype(str).str.lower().isin(['sí','si','true','1']).mean()*100):.0f}%" if not df_cat_f.empty else "—")
+k4.metric("% Continuo", f"{df_cat_f['continuo_bool'].mean()*100:.0f}%" if not df_cat_f.empty else "—")
 
 # =============== Pestañas ===============
 tabs = st.tabs([
@@ -176,116 +267,185 @@ tabs = st.tabs([
 ])
 
 def _sanitize_hierarchy(df, path):
+    # Sólo las columnas de la jerarquía (como texto: admite '' aunque sean category)
+    sub = df[path].astype("string")
     # Remove rows with missing values in any of the path columns
-    df_clean = df.dropna(subset=path)
+    sub = sub[sub.notna().all(axis=1)]
     # Replace empty strings with 'Unknown' to avoid Plotly errors
-    for col in path:
-        df_clean[col] = df_clean[col].replace("", "Unknown")
-    return df_clean
-
-with tabs[0]:
+    return sub.mask(sub == "", "Unknown").assign(__leaf__=1)  # fuerza conteo explícito de hojas
+
+@st.cache_data(show_spinner=False, max_entries=32, hash_funcs=FINGERPRINT_HASH)
+def heatmap_counts(df):
+    # Conteo Segmento × Emisión sobre los códigos de category: matriz densa con np.add.at, sin groupby
+    seg, tipo = df["segmento_negocio"].cat, df["tipo_emision"].cat
+    codes_s, codes_t = seg.codes.to_numpy(), tipo.codes.to_numpy()
+    ok = (codes_s >= 0) & (codes_t >= 0)  # código -1 = NaN (groupby también los descarta)
+    mat = np.zeros((len(seg.categories), len(tipo.categories)), dtype=np.int32)
+    np.add.at(mat, (codes_s[ok], codes_t[ok]), 1)
+    i, j = np.nonzero(mat)
+    return pd.DataFrame({"segmento_negocio": seg.categories[i], "tipo_emision": tipo.categories[j], "conteo": mat[i, j]})
+
+# Figuras cacheadas como recurso por huella de la vista filtrada: cache_resource devuelve el mismo
+# objeto sin el pickle/unpickle que cache_data haría en cada acceso (las figuras no se mutan después)
+@st.cache_resource(show_spinner=False, max_entries=32, hash_funcs=FINGERPRINT_HASH)
+def build_sunburst(df):
+    # Saneamos y garantizamos hojas para evitar errores de Plotly
+    df_sb = _sanitize_hierarchy(df, ["segmento_negocio","tipo_emision","taxonomia"])
+    sb = px.sunburst(
+        df_sb,
+        path=["segmento_negocio","tipo_emision","taxonomia"],
+        values="__leaf__",
+        title="Segmento → Emisión → Taxonomía"
+    )
+    sb.update_layout(height=520, margin=dict(t=40,b=0,l=0,r=0))
+    return sb
+
+@st.cache_resource(show_spinner=False, max_entries=32, hash_funcs=FINGERPRINT_HASH)
+def build_treemap(df):
+    df_tm = _sanitize_hierarchy(df, ["taxonomia","familia","proveedor"])
+    tm = px.treemap(
+        df_tm,
+        path=["taxonomia","familia","proveedor"],
+        values="__leaf__",
+        title="Taxonomía → Familia → Proveedor"
+    )
+    tm.update_layout(height=520, margin=dict(t=40,b=0,l=0,r=0))
+    return tm
+
+@st.cache_resource(show_spinner=False, max_entries=32, hash_funcs=FINGERPRINT_HASH)
+def build_heatmap(df):
+    mat = heatmap_counts(df)
+    fig = px.density_heatmap(mat, x="tipo_emision", y="segmento_negocio", z="conteo",
+                             color_continuous_scale="Blues", title="Disponibilidad de tecnologías")
+    fig.update_layout(height=520)
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=32, hash_funcs=FINGERPRINT_HASH)
+def build_scatter(df):
+    scatter = df.dropna(subset=["trl_num","lod_num"])
+    fig = px.scatter(scatter, x="trl_num", y="lod_num", color="tipo_emision",
+                     hover_data=["proveedor","producto_modelo","taxonomia","eje_monitoreo"],
+                     labels={"trl_num":"TRL","lod_num":"LOD (num)"})
+    fig.update_layout(height=520)
+    return fig
+
+# Puntajes del radar: primera fila por tecnología, indexada por 'key'
+@st.cache_data(show_spinner=False, max_entries=32, hash_funcs=FINGERPRINT_HASH)
+def radar_table(df):
+    keyed = df.drop_duplicates("key").set_index("key")[RADAR_METRICS]
+    keyed.index = keyed.index.astype(str)  # índice plano: sólo las tecnologías elegidas llegan al gráfico
+    return keyed
+
+# El radar recibe la tabla larga de puntajes (pocas filas): se hashea por contenido
+@st.cache_resource(show_spinner=False, max_entries=32)
+def build_radar(pdf):
+    fig = px.line_polar(pdf, r="valor", theta="métrica", color="tec", line_close=True, range_r=[0,100])
+    fig.update_traces(fill='toself', opacity=0.5)
+    fig.update_layout(height=620, legend_title_text="Tecnología")
+    return fig
+
+# CSV de descarga cacheado por huella: se escribe directo a bytes y no se regenera en cada rerun
+@st.cache_data(show_spinner=False, max_entries=32, hash_funcs=FINGERPRINT_HASH)
+def to_csv_bytes(df):
+    buf = io.BytesIO()
+    df.drop(columns=INTERNAL_COLS, errors="ignore").to_csv(buf, index=False)
+    return buf.getvalue()
+
+# st.tabs ejecuta el cuerpo de todas las pestañas en cada rerun (aunque estén ocultas):
+# las pesadas se cargan a demanda y quedan abiertas durante la sesión (Overview abierta por defecto)
+def tab_opened(name: str) -> bool:
+    opened = st.session_state.setdefault("tab_opened", {"overview"})
+    if name not in opened:
+        # El callback marca la pestaña antes del rerun del fragmento, que ya la dibuja sin el botón
+        st.button("Cargar visualización", key=f"load_{name}", on_click=opened.add, args=(name,))
+    return name in opened
+
+# Cada pestaña pesada es un fragmento: sus propios widgets (p.ej. el selector del Radar)
+# sólo relanzan el fragmento; un cambio de filtros sigue relanzando todo el script
+@st.fragment
+def render_overview(df_cat_f):
     st.subheader("Sunburst y Treemap")
+    if not tab_opened("overview"):
+        return
     if df_cat_f.empty:
         st.info("Ajusta filtros o verifica datos.")
     else:
         colA, colB = st.columns([1,1])
-        # Saneamos y garantizamos hojas para evitar errores de Plotly
-        df_sb = _sanitize_hierarchy(df_cat_f, ["segmento_negocio","tipo_emision","taxonomia"])
-        df_sb["__leaf__"] = 1  # fuerza conteo explícito de hojas
-        sb = px.sunburst(
-            df_sb,
-            path=["segmento_negocio","tipo_emision","taxonomia"],
-            values="__leaf__",
-            title="Segmento → Emisión → Taxonomía"
-        )
-        sb.update_layout(height=520, margin=dict(t=40,b=0,l=0,r=0))
-        colA.plotly_chart(sb, use_container_width=True)
+        colA.plotly_chart(build_sunburst(df_cat_f), use_container_width=True)
 
         if "familia" in df_cat_f.columns:
-            df_tm = _sanitize_hierarchy(df_cat_f, ["taxonomia","familia","proveedor"])
-            df_tm["__leaf__"] = 1
-            tm = px.treemap(
-                df_tm,
-                path=["taxonomia","familia","proveedor"],
-                values="__leaf__",
-                title="Taxonomía → Familia → Proveedor"
-            )
-            tm.update_layout(height=520, margin=dict(t=40,b=0,l=0,r=0))
-            colB.plotly_chart(tm, use_container_width=True)
+            colB.plotly_chart(build_treemap(df_cat_f), use_container_width=True)
         else:
             colB.info("Añade columna 'familia' para ver Treemap (Taxonomía → Familia → Proveedor).")
 
-with tabs[1]:
+@st.fragment
+def render_heatmap(df_cat_f):
     st.subheader("Mapa de calor (Segmento × Tipo de emisión)")
     if df_cat_f.empty:
         st.info("Sin datos tras filtros.")
     else:
-        mat = (df_cat_f.groupby(["segmento_negocio","tipo_emision"])
-               .size().reset_index(name="conteo"))
-        fig = px.density_heatmap(mat, x="tipo_emision", y="segmento_negocio", z="conteo",
-                                 color_continuous_scale="Blues", title="Disponibilidad de tecnologías")
-        fig.update_layout(height=520)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(build_heatmap(df_cat_f), use_container_width=True)
 
-with tabs[2]:
+@st.fragment
+def render_scatter(df_cat_f):
     st.subheader("TRL vs Límite de detección (LOD)")
+    if not tab_opened("scatter"):
+        return
     df_sc = df_cat_f.dropna(subset=["trl_num"])
     if df_sc.empty:
         st.info("No hay TRL numérico.")
+    elif df_sc["lod_num"].isna().all():
+        st.info("No hay LOD numérico suficiente.")
     else:
-        if "lod_num" not in df_sc.columns:
-            df_sc["lod_num"] = pd.to_numeric(df_sc.get("limite_deteccion_valor", np.nan), errors="coerce")
-        scatter = df_sc.dropna(subset=["lod_num"])
-        if scatter.empty:
-            st.info("No hay LOD numérico suficiente.")
-        else:
-            fig = px.scatter(scatter, x="trl_num", y="lod_num", color="tipo_emision",
-                             hover_data=["proveedor","producto_modelo","taxonomia","eje_monitoreo"],
-                             labels={"trl_num":"TRL","lod_num":"LOD (num)"})
-            fig.update_layout(height=520)
-            st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(build_scatter(df_cat_f), use_container_width=True)
 
-with tabs[3]:
+@st.fragment
+def render_radar(df_cat_f):
     st.subheader("Radar de evaluación (elige 2–5 tecnologías)")
+    if not tab_opened("radar"):
+        return
     if df_cat_f.empty:
         st.info("Sin datos tras filtros.")
     else:
-        df_cat_f["key"] = df_cat_f["proveedor"].fillna("") + " — " + df_cat_f["producto_modelo"].fillna("")
-        choices = st.multiselect("Selecciona tecnologías", sorted(df_cat_f["key"].unique()))
-        metrics = ["exactitud_score","cobertura_score","costo_score","robustez_score","trl_num"]
-        labels_map = {"exactitud_score":"Exactitud","cobertura_score":"Cobertura","costo_score":"Costo (invertido)","robustez_score":"Robustez","trl_num":"TRL"}
+        # Claves presentes en la vista, ya ordenadas (códigos únicos sobre categorías ordenadas)
+        keys = df_cat_f["key"].cat
+        choices = st.multiselect("Selecciona tecnologías", keys.categories[np.unique(keys.codes)].tolist())
+        keyed = radar_table(df_cat_f)
 
         if 2 <= len(choices) <= 5:
-            plot_df = []
-            for k in choices:
-                row = df_cat_f[df_cat_f["key"]==k].iloc[0].copy()
-                vals = {
-                    "exactitud_score": row.get("exactitud_score", np.nan),
-                    "cobertura_score": row.get("cobertura_score", np.nan),
-                    "costo_score": row.get("costo_score", np.nan),
-                    "robustez_score": row.get("robustez_score", np.nan),
-                    "trl_num": (row.get("trl_num", np.nan) or np.nan) * (100/9.0)
-                }
-                for m in metrics:
-                    plot_df.append({"tec": k, "métrica": labels_map[m], "valor": vals[m]})
-
-            pdf = pd.DataFrame(plot_df).dropna(subset=["valor"])
+            sub = keyed.loc[choices].copy()
+            # TRL a escala 0–100; un TRL 0 se grafica como 0 (antes `trl or nan` lo descartaba del radar)
+            # (en float64: el float32 de trl_num dejaría ruido tipo 88.888885 en la tabla)
+            sub["trl_num"] = sub["trl_num"].astype("float64") * (100/9.0)
+            # Formato largo tecnología-por-tecnología (mantiene el orden de selección en la leyenda)
+            pdf = (sub.stack(future_stack=True).rename_axis(["tec","métrica"])
+                   .reset_index(name="valor").dropna(subset=["valor"]))
+            pdf["métrica"] = pdf["métrica"].map(RADAR_LABELS)
             if pdf.empty:
                 st.info("No hay puntajes suficientes para el radar (agrega *_score en tu Excel si quieres control total).")
             else:
-                fig = px.line_polar(pdf, r="valor", theta="métrica", color="tec", line_close=True, range_r=[0,100])
-                fig.update_traces(fill='toself', opacity=0.5)
-                fig.update_layout(height=620, legend_title_text="Tecnología")
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(build_radar(pdf), use_container_width=True)
 
                 with st.expander("Ver tabla de puntajes"):
                     st.dataframe(pdf.pivot_table(index="tec", columns="métrica", values="valor"), use_container_width=True)
         else:
             st.info("Selecciona entre 2 y 5 tecnologías para comparar en el radar.")
 
+with tabs[0]:
+    render_overview(df_cat_f)
+
+with tabs[1]:
+    render_heatmap(df_cat_f)
+
+with tabs[2]:
+    render_scatter(df_cat_f)
+
+with tabs[3]:
+    render_radar(df_cat_f)
+
 with tabs[4]:
     st.subheader("Catálogo (filtrable)")
-    st.dataframe(df_cat_f, use_container_width=True)
+    st.dataframe(df_cat_f.drop(columns=INTERNAL_COLS), use_container_width=True)
 
 with tabs[5]:
     st.subheader("Contactos")
@@ -296,11 +456,11 @@ with tabs[5]:
 
 with tabs[6]:
     st.subheader("Exportar")
-    st.download_button("Descargar catálogo filtrado (CSV)", data=df_cat_f.to_csv(index=False), file_name="catalogo_filtrado.csv")
+    st.download_button("Descargar catálogo filtrado (CSV)", data=to_csv_bytes(df_cat_f), file_name="catalogo_filtrado.csv", mime="text/csv")
     if not df_adop.empty:
-        st.download_button("Descargar adopción (CSV)", data=df_adop.to_csv(index=False), file_name="adopcion.csv")
+        st.download_button("Descargar adopción (CSV)", data=to_csv_bytes(df_adop), file_name="adopcion.csv", mime="text/csv")
     if not df_contacts.empty:
-        st.download_button("Descargar contactos (CSV)", data=df_contacts.to_csv(index=False), file_name="contactos.csv")
+        st.download_button("Descargar contactos (CSV)", data=to_csv_bytes(df_contacts), file_name="contactos.csv", mime="text/csv")
 
 st.divider()
 st.subheader("Validaciones de entrada")